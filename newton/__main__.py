@@ -29,9 +29,11 @@
 
 import sys
 import os
+import datetime
+import math
 import newton as newton
 import pnlexer as pnlexer
-from typing import List, Union, Tuple
+from typing import List, Union, Tuple, Optional, NamedTuple, Dict
 from enum import Enum
 
 
@@ -54,12 +56,31 @@ Argumentos opcionais:
     verbose -> Imprime a saída do resultado de maneira mais legível.
 """
 
+ERROR_OUTPUT = "linha={line} erro={reason}"
+
 
 class IOKind(Enum):
     STD = 0
     FILE = 1
 
 
+class Task(NamedTuple):
+    """Classe imutável Task.
+
+    Representa uma linha do lote cuja execução foi adiada para ser agrupada com as demais
+    linhas da mesma função. O atributo `slot` é a posição do resultado em `output_data`.
+    """
+    slot: int
+    line_number: int
+    func_str: str
+    epsilon: float
+    initial_x: Union[int, float]
+    max_iterations: int
+    verbose: bool
+    line_budget: Optional[float]
+    job_budget: Optional[float]
+
+
 class Context:
     """Classe de contexto Context.
 
@@ -81,6 +102,14 @@ class Context:
         self.default_kmax: int = 100000
         self.default_e: int = 0.0001
         self.default_verbose: bool = False
+        self.line_budget: Optional[float] = None
+        self.job_budget: Optional[float] = None
+        self.job_start: Optional[datetime.datetime] = None
+        self.adaptive: bool = False
+        self.line_number: int = 0
+        self.over_budget: List[int] = []
+        self.plan: Dict[str, List[Task]] = {}
+        self.failures: List[Tuple[int, str]] = []
 
     def run(self):
         argv = self.argv
@@ -127,17 +156,23 @@ class Context:
             if 'verbose' in argv[5:]:
                 self.verbose = True
 
-            e, initial_x, kmax = self.get_argument_values(argv[2], argv[3], argv[4])
+            try:
+                e, initial_x, kmax = self.get_argument_values(argv[2], argv[3], argv[4])
+            except pnlexer.ParseError as error:
+                print(error)
+                quit()
             print("K_MAX", kmax, argv[3])
 
             self.function_string = func
 
         print("\nProcessando. Por favor, espere...\n")
         if self.input_kind is IOKind.STD:
-            scanner: pnlexer.Scanner = pnlexer.Scanner(self.function_string)
-            fn: pnlexer.F = scanner.scan()
-
-            output: str = newton.newton_raphson(fn, e, initial_x, kmax, self.verbose)
+            try:
+                fn: pnlexer.F = self.scan_function(self.function_string)
+                output: str = newton.newton_raphson(fn, e, initial_x, kmax, self.verbose)
+            except (pnlexer.ParseError, newton.SolveError) as error:
+                print(error)
+                quit()
 
             self.output_data.append(output)
 
@@ -179,31 +214,52 @@ class Context:
         if split[0] == arg:
             try:
                value = eval(split[0])
-               assert isinstance(value, (int, float))
-            except (SyntaxError, AssertionError):
-                print(f"Argumento inválido: '{arg}'")
-                quit()
+               assert isinstance(value, (int, float)) and math.isfinite(value)
+            except Exception:
+                raise pnlexer.ParseError(f"Argumento inválido: '{arg}'")
         elif len(split) == 2:
             try:
                value = eval(split[1])
                name = split[0]
-               assert isinstance(value, (int, float))
-            except (SyntaxError, AssertionError):
-                print(f"Argumento inválido: '{arg}'")
-                quit()
+               assert isinstance(value, (int, float)) and math.isfinite(value)
+            except Exception:
+                raise pnlexer.ParseError(f"Argumento inválido: '{arg}'")
 
         return name, value
 
     def process_input_data(self) -> None:
         self.load_input()
         if self.input_kind is IOKind.FILE:
-            for line in self.input_data:
-                self.parse_input_line(line)
+            self.job_start = datetime.datetime.now()
+            for line_number, line in enumerate(self.input_data, 1):
+                self.line_number = line_number
+                try:
+                    self.parse_input_line(line)
+                except Exception as error:
+                    self.output_data.append(self.record_failure(line_number, error))
+            self.run_plan()
+
+            if self.failures:
+                lines = ', '.join(str(n) for n in sorted(set(n for n, _ in self.failures)))
+                print(f"Linhas com erro: {lines}")
+
+            if self.over_budget:
+                lines = ', '.join(str(n) for n in sorted(self.over_budget))
+                print(f"Linhas que excederam o orçamento de tempo: {lines}")
 
     def parse_input_line(self, line: str) -> None:
         if line.lower().startswith('default'):
             print(f"Alterando argumentos padrão: {line}")
             self.set_defaults(line)
+        elif line.lower().startswith('budget'):
+            print(f"Alterando orçamento de tempo: {line}")
+            self.set_budget(line)
+        elif line.lower().startswith('adaptive'):
+            print(f"Alterando modo adaptativo: {line}")
+            self.adaptive = line.strip().lower() not in ('adaptive off', 'adaptive 0')
+        elif line.lower().startswith('sweep'):
+            print(f"Processando varredura {line}")
+            self.process_sweep_line(line)
         else:
             print(f"Processando {line}")
             self.process_input_line(line)
@@ -236,49 +292,183 @@ class Context:
             else:
                 self.default_verbose = True
 
+    def set_budget(self, line: str) -> None:
+        for part in line.strip().split()[1:]:
+            name, value = self.parse_argument(part.strip())
+            budget: Optional[float] = value if value > 0 else None
+            if name.lower() in ('line', 'linha'):
+                self.line_budget = budget
+            elif name.lower() in ('job', 'lote'):
+                self.job_budget = budget
+            else:
+                print(f"Orçamento inválido: '{part}' (esperado: 'line=segundos' ou 'job=segundos')")
+
+    def get_deadline(self, line_budget: Optional[float], job_budget: Optional[float]) -> Optional[datetime.datetime]:
+        deadlines: List[datetime.datetime] = []
+        if line_budget is not None:
+            deadlines.append(datetime.datetime.now() + datetime.timedelta(seconds=line_budget))
+        if job_budget is not None and self.job_start is not None:
+            deadlines.append(self.job_start + datetime.timedelta(seconds=job_budget))
+        return min(deadlines) if deadlines else None
+
+    def record_failure(self, line_number: int, error: Exception, context: str='') -> str:
+        if isinstance(error, (pnlexer.ParseError, newton.SolveError)):
+            reason: str = context + error.reason
+        else:
+            reason = f"{context}Erro inesperado ({type(error).__name__}): {error}"
+        print(f"Erro na linha {line_number}: {reason}")
+        self.failures.append((line_number, reason))
+        return ERROR_OUTPUT.format(line=line_number, reason=reason)
+
+    def scan_function(self, func_str: str) -> pnlexer.F:
+        if not func_str.endswith(';'):
+            func_str = f"{func_str};"
+        scanner: pnlexer.Scanner = pnlexer.Scanner(func_str)
+        func: pnlexer.F = scanner.scan()
+        for literal in func.get_literals():
+            if literal != 'x':
+                raise pnlexer.ParseError(f"Variável '{literal}' não suportada: use 'x'.")
+        return func
+
+    def check_budget(self, deadline: Optional[datetime.datetime]) -> None:
+        if deadline is not None and datetime.datetime.now() > deadline:
+            print(f"Orçamento de tempo excedido na linha {self.line_number}.")
+            self.over_budget.append(self.line_number)
+
     def process_input_line(self, line: str) -> None:
         parts: List[str] = line.strip().split()
         n = len(parts)
-        func_str: str = ''
+
+        if n == 0:
+            return
+
+        func_str: str = parts[0].strip().strip('\'\"')
+        e, initial_x, kmax, verbose = self.get_line_arguments(parts[1:])
+
+        if self.input_kind is IOKind.FILE and not self.adaptive:
+            key: str = func_str[:-1] if func_str.endswith(';') else func_str
+            task = Task(len(self.output_data), self.line_number, func_str, e, initial_x, kmax, verbose,
+                        self.line_budget, self.job_budget)
+            self.plan.setdefault(key, []).append(task)
+            self.output_data.append('')
+            return
+
+        func: pnlexer.F = self.scan_function(func_str)
+        deadline: Optional[datetime.datetime] = self.get_deadline(self.line_budget, self.job_budget)
+        output: str = newton.newton_raphson(func, e, initial_x, kmax, verbose, deadline, self.adaptive)
+        self.output_data.append(output)
+        self.check_budget(deadline)
+
+    def run_plan(self) -> None:
+        for key, tasks in self.plan.items():
+            print(f"Resolvendo {key} ({len(tasks)} linha(s))")
+            try:
+                self.run_group(tasks)
+            except Exception as error:
+                for task in tasks:
+                    if not self.output_data[task.slot]:
+                        self.output_data[task.slot] = self.record_failure(task.line_number, error)
+        self.plan = {}
+
+    def run_group(self, tasks: List[Task]) -> None:
+        func: pnlexer.F = self.scan_function(tasks[0].func_str)
+        df: pnlexer.F = func.derive()
+
+        starts: List[newton.Start] = [
+            newton.Start(t.epsilon, t.initial_x, t.max_iterations, self.get_deadline(None, t.job_budget),
+                         None if t.line_budget is None else datetime.timedelta(seconds=t.line_budget))
+            for t in tasks
+        ]
+        results: List[Union[newton.Result, newton.SolveError]] = newton.solve_many(func, starts)
+
+        for task, result in zip(tasks, results):
+            if isinstance(result, newton.SolveError):
+                self.output_data[task.slot] = self.record_failure(task.line_number, result)
+                continue
+            try:
+                self.output_data[task.slot] = newton.format_result(func, df, task.initial_x, task.epsilon,
+                                                                   task.max_iterations, result, task.verbose)
+            except Exception as error:
+                self.output_data[task.slot] = self.record_failure(task.line_number, error)
+                continue
+            if result.status is newton.Status.TIMEOUT:
+                self.over_budget.append(task.line_number)
+
+    def process_sweep_line(self, line: str) -> None:
+        parts: List[str] = line.strip().split()
+        n = len(parts)
+
+        if n < 3:
+            raise pnlexer.ParseError(f"Número insuficiente de argumentos para 'sweep': '{line.strip()}'")
+
+        template: str = parts[1].strip().strip('\'\"')
+        if not template.endswith(';'):
+            template = f"{template};"
+        param, values = self.parse_sweep(parts[2].strip())
+        e, initial_x, kmax, verbose = self.get_line_arguments(parts[3:])
+        for literal in template.replace(f"{{{param}}}", ''):
+            if literal.isalpha() and literal != 'x':
+                raise pnlexer.ParseError(f"Variável '{literal}' não suportada: use 'x'.")
+
+        deadline: Optional[datetime.datetime] = self.get_deadline(self.line_budget, self.job_budget)
+        outputs: List[Union[str, pnlexer.ParseError, newton.SolveError]] = newton.continuation(
+            template, param, values, e, initial_x, kmax, verbose, deadline, self.adaptive)
+        for value, output in zip(values, outputs):
+            if isinstance(output, str):
+                self.output_data.append(output)
+            else:
+                self.output_data.append(self.record_failure(self.line_number, output, f"{param}={value}: "))
+        self.check_budget(deadline)
+
+    def get_line_arguments(self, parts: List[str]) -> Tuple[float, Union[int, float], int, bool]:
+        n = len(parts)
         verbose: bool = self.default_verbose
         arg1 = f'e={self.default_e}'
         arg2 = f'x={self.default_x}'
         arg3 = f'k={self.default_kmax}'
 
-        if n == 0:
-            return
-
         if n >= 1:
-            func_str: str = parts[0].strip().strip('\'\"')
+            if parts[0].lower() != 'verbose':
+                arg1 = parts[0].strip()
+            else:
+                verbose = True
 
         if n >= 2:
             if parts[1].lower() != 'verbose':
-                arg1 = parts[1].strip()
+                arg2 = parts[1].strip()
             else:
                 verbose = True
 
         if n >= 3:
             if parts[2].lower() != 'verbose':
-                arg2 = parts[2].strip()
+                arg3 = parts[2].strip()
             else:
                 verbose = True
 
         if n >= 4:
-            if parts[3].lower() != 'verbose':
-                arg3 = parts[3].strip()
-            else:
-                verbose = True
-
-        if n >= 5:
-            if parts[4].lower() == 'verbose':
+            if parts[3].lower() == 'verbose':
                 verbose = True
 
         e, initial_x, kmax = self.get_argument_values(arg1, arg2, arg3)
+        return e, initial_x, kmax, verbose
 
-        scanner: pnlexer.Scanner = pnlexer.Scanner(func_str)
-        func: pnlexer.F = scanner.scan()
-        output: str = newton.newton_raphson(func, e, initial_x, kmax, verbose)
-        self.output_data.append(output)
+    def parse_sweep(self, arg: str) -> Tuple[str, List[float]]:
+        split: List[str] = arg.split('=')
+        bounds: List[str] = split[-1].split(':')
+        if len(split) != 2 or len(bounds) != 3:
+            raise pnlexer.ParseError(f"Varredura inválida: '{arg}' (esperado: 'a=inicio:fim:passo')")
+
+        try:
+            start, stop, step = (float(b) for b in bounds)
+            assert step != 0
+        except (ValueError, AssertionError):
+            raise pnlexer.ParseError(f"Varredura inválida: '{arg}'")
+
+        if (stop - start) * step < 0:
+            raise pnlexer.ParseError(f"Varredura inválida: '{arg}' (o passo deve ir de inicio a fim)")
+
+        count = round((stop - start) / step)
+        return split[0], [start + i * step for i in range(count + 1)]
 
     def load_input(self) -> None:
         if self.input_kind is IOKind.FILE:
@@ -28,12 +28,24 @@
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 import datetime
-from typing import Union
-from pnlexer import F
+import decimal
+import math
+from enum import Enum
+from typing import Union, NamedTuple, List, Optional, Tuple, Dict
+from pnlexer import F, Scanner, Powers, Horner, DomainError, ParseError
 
 
 __all__ = [
-    'newton_raphson'
+    'SolveError',
+    'Status',
+    'Result',
+    'solve',
+    'solve_adaptive',
+    'Start',
+    'solve_many',
+    'newton_raphson',
+    'bind',
+    'continuation',
 ]
 
 
@@ -49,42 +61,433 @@ OUTPUT_VERBOSE = """\n\n{func} -> {df} para X inicial {initial_x}, e {max_iterat
 
 OUTPUT = "y={func} y'={df} e={epsilon} x={x} k={iteration}/{max_iterations} f(x)={eps}  tempo={delta}"
 
+OUTPUT_STATUS = "  situação={status}"
 
-def newton_raphson(func: F, epsilon: float, initial_x: Union[int, float], max_iterations: int,
-                   verbose: bool=False) -> str:
+OUTPUT_STATUS_VERBOSE = """                         Situação: {status}
+
+"""
+
+# Intervalo, em iterações, entre as verificações do prazo de execução.
+DEADLINE_CHECK = 64
+
+# Máximo de iterações da primeira rodada do modo adaptativo.
+ADAPTIVE_KMAX = 16
+
+# Fator de aumento do máximo de iterações entre rodadas do modo adaptativo.
+ADAPTIVE_GROWTH = 4
+
+# Fator mínimo de redução da correção entre rodadas para que o modo adaptativo prossiga.
+ADAPTIVE_PROGRESS = 0.5
+
+# Máximo de iterações de cada passo de continuação, antes de reduzir o passo do parâmetro.
+CONTINUATION_KMAX = 8
+
+# Número máximo de reduções à metade do passo do parâmetro, antes de recorrer ao X inicial.
+CONTINUATION_HALVINGS = 6
+
+
+class SolveError(ArithmeticError):
+    """Exceção SolveError.
+
+    Indica que a execução do método não pôde prosseguir, por exemplo porque a derivada
+    se anulou. O atributo `reason` descreve o erro; `x` e `iteration` são o valor de x e
+    o número da iteração em que ele ocorreu.
+    """
+
+    def __init__(self, reason: str, x: Union[int, float], iteration: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.x = x
+        self.iteration = iteration
+
+
+def step_error(error: ArithmeticError, x: Union[int, float], iteration: int) -> SolveError:
+    """Converte o erro aritmético de uma iteração na exceção `SolveError` correspondente."""
+    if isinstance(error, ZeroDivisionError):
+        return SolveError(f"Derivada nula em x={x}, na iteração {iteration + 1}.", x, iteration)
+    return SolveError(f"Estouro numérico em x={x}, na iteração {iteration + 1}.", x, iteration)
+
+
+def finite(value: Union[int, float]) -> bool:
+    """Retorna verdadeiro se `value` é finito; inteiros, que não estouram, sempre o são."""
+    return not isinstance(value, float) or math.isfinite(value)
+
+
+class Status(Enum):
+    CONVERGED = 0
+    MAX_ITERATIONS = 1
+    TIMEOUT = 2
+    STALLED = 3
+    DOMAIN = 4
+
+
+STATUS_MESSAGES = {
+    Status.CONVERGED: 'convergiu',
+    Status.MAX_ITERATIONS: 'máximo de iterações atingido',
+    Status.TIMEOUT: 'tempo esgotado',
+    Status.STALLED: 'sem progresso',
+    Status.DOMAIN: 'fora do domínio',
+}
+
+
+class Result(NamedTuple):
+    """Classe imutável Result.
+
+    Representa o resultado de uma execução do método: o valor `x` da última iteração,
+    o número de iterações `iteration`, a última correção `eps`, o tempo `delta` e a
+    situação `status` em que a execução terminou.
+    """
+    x: Union[int, float]
+    iteration: int
+    eps: Union[int, float]
+    delta: datetime.timedelta
+    status: Status = Status.CONVERGED
+
+    def converged(self, epsilon: float) -> bool:
+        """Retorna verdadeiro se a última correção é menor ou igual a `epsilon`."""
+        return abs(self.eps) <= epsilon
+
+
+def solve(func: F, epsilon: float, initial_x: Union[int, float], max_iterations: int,
+          deadline: Optional[datetime.datetime]=None) -> Result:
+    """Executa o método de Newton sobre `func` e retorna o resultado.
+
+    A cada iteração, a função e sua derivada são avaliadas juntas, em uma única passagem: pela
+    forma de Horner (veja `F.horner`) ou, se ela não se aplicar, por `F.eval_fused`.
+    Se `deadline` for informado, a execução é interrompida quando o prazo for ultrapassado.
+    Se `x` sair do domínio de uma potência de expoente fracionário ou negativo, a execução
+    termina com a situação `Status.DOMAIN`.
+    Se a derivada se anular ou o valor da função ou da derivada deixar de ser finito, a
+    exceção `SolveError` é lançada.
+    """
     iteration: int = 0
     eps: int = 100000
     x: Union[int, float] = initial_x
-    df = func.derive()
+    status: Status = Status.MAX_ITERATIONS
+    horner: Optional[Horner] = func.horner()
 
     now = datetime.datetime.now()
-    while abs(eps) > epsilon and iteration < max_iterations:
-        eps = func.eval(x=x) / df.eval(x=x)
-        x -= eps
-        iteration += 1
+    try:
+        while abs(eps) > epsilon and iteration < max_iterations:
+            if deadline is not None and iteration % DEADLINE_CHECK == 0 and datetime.datetime.now() > deadline:
+                status = Status.TIMEOUT
+                if iteration == 0:
+                    eps = float('nan')
+                break
+            if horner is not None:
+                f, df = horner.eval(x)
+            else:
+                f, df = func.eval_fused(Powers(x))
+            if not (finite(f) and finite(df)):
+                raise OverflowError
+            eps = f / df
+            x -= eps
+            iteration += 1
+    except DomainError:
+        status = Status.DOMAIN
+        if iteration == 0:
+            eps = float('nan')
+    except (ZeroDivisionError, OverflowError) as error:
+        raise step_error(error, x, iteration) from error
     delta = datetime.datetime.now() - now
 
-    if verbose:
-        return OUTPUT_VERBOSE.format(
-            func=func,
-            df=df,
-            initial_x=initial_x,
-            max_iterations=max_iterations,
-            iteration=iteration,
-            x=x,
-            epsilon=epsilon,
-            eps=eps,
-            delta=delta
-        )
+    if abs(eps) <= epsilon:
+        status = Status.CONVERGED
+    return Result(x, iteration, eps, delta, status)
+
+
+def solve_adaptive(func: F, epsilon: float, initial_x: Union[int, float], max_iterations: int,
+                   deadline: Optional[datetime.datetime]=None) -> Result:
+    """Executa o método de Newton em rodadas de máximo de iterações crescente.
+
+    A primeira rodada tem até `ADAPTIVE_KMAX` iterações; cada rodada seguinte continua da
+    última iteração da anterior, com `ADAPTIVE_GROWTH` vezes mais iterações, somente se a
+    correção tiver sido reduzida pelo fator `ADAPTIVE_PROGRESS`. Caso contrário, a execução
+    termina com a situação `Status.STALLED`.
+    """
+    x: Union[int, float] = initial_x
+    iteration: int = 0
+    eps: float = float('nan')
+    delta = datetime.timedelta()
+    previous_eps: float = float('inf')
+    kmax: int = ADAPTIVE_KMAX
+
+    while True:
+        result = solve(func, epsilon, x, min(kmax, max_iterations - iteration), deadline)
+        x = result.x
+        iteration += result.iteration
+        delta += result.delta
+        if result.iteration > 0 or iteration == 0:
+            eps = result.eps
+        if result.status is not Status.MAX_ITERATIONS or iteration >= max_iterations:
+            return Result(x, iteration, eps, delta, result.status)
+        if abs(result.eps) > ADAPTIVE_PROGRESS * previous_eps:
+            return Result(x, iteration, result.eps, delta, Status.STALLED)
+        previous_eps = abs(result.eps)
+        kmax *= ADAPTIVE_GROWTH
+
+
+class Start(NamedTuple):
+    """Classe imutável Start.
+
+    Representa um ponto de partida de `solve_many`: o erro `epsilon`, o valor inicial
+    `initial_x`, o máximo de iterações `max_iterations`, o prazo `deadline` e o tempo
+    máximo `budget` que pode ser gasto com as iterações deste ponto.
+    """
+    epsilon: float
+    initial_x: Union[int, float]
+    max_iterations: int
+    deadline: Optional[datetime.datetime] = None
+    budget: Optional[datetime.timedelta] = None
+
+
+def solve_many(func: F, starts: List[Start]) -> List[Union[Result, SolveError]]:
+    """Executa o método de Newton sobre `func` a partir de cada ponto de `starts` e retorna
+    os resultados na mesma ordem.
+
+    Todos os pontos avançam juntos, uma iteração por vez; o tempo de cada rodada é dividido
+    igualmente entre os pontos iterados nela, de modo que o tempo de cada resultado e o
+    tempo máximo `budget` de cada ponto consideram apenas as suas próprias iterações. Cada
+    ponto deixa de ser iterado assim que converge, atinge seu máximo de iterações, ultrapassa
+    seu prazo ou esgota seu tempo máximo. Um ponto
+    cuja execução falhar tem como resultado a exceção `SolveError` correspondente, sem
+    interromper os demais.
+    """
+    n = len(starts)
+    xs: List[Union[int, float]] = [start.initial_x for start in starts]
+    eps: List[Union[int, float]] = [100000] * n
+    iterations: List[int] = [0] * n
+    statuses: List[Status] = [Status.MAX_ITERATIONS] * n
+    deltas: List[datetime.timedelta] = [datetime.timedelta()] * n
+    errors: Dict[int, SolveError] = {}
+    active: List[int] = [i for i in range(n)
+                         if abs(eps[i]) > starts[i].epsilon and starts[i].max_iterations > 0]
+    rounds: int = 0
+    horner: Optional[Horner] = func.horner()
+
+    now = datetime.datetime.now()
+    while active:
+        if rounds % DEADLINE_CHECK == 0:
+            for i in active:
+                deadline, budget = starts[i].deadline, starts[i].budget
+                if (deadline is not None and now > deadline) or (budget is not None and deltas[i] > budget):
+                    statuses[i] = Status.TIMEOUT
+                    if iterations[i] == 0:
+                        eps[i] = float('nan')
+            active = [i for i in active if statuses[i] is not Status.TIMEOUT]
+            if not active:
+                break
+
+        remaining: List[int] = []
+        for i in active:
+            x = xs[i]
+            try:
+                if horner is not None:
+                    f, df = horner.eval(x)
+                else:
+                    f, df = func.eval_fused(Powers(x))
+                if not (finite(f) and finite(df)):
+                    raise OverflowError
+                eps[i] = f / df
+            except DomainError:
+                statuses[i] = Status.DOMAIN
+                if iterations[i] == 0:
+                    eps[i] = float('nan')
+                continue
+            except (ZeroDivisionError, OverflowError) as error:
+                errors[i] = step_error(error, x, iterations[i])
+                continue
+            xs[i] = x - eps[i]
+            iterations[i] += 1
+            if abs(eps[i]) > starts[i].epsilon and iterations[i] < starts[i].max_iterations:
+                remaining.append(i)
+
+        current = datetime.datetime.now()
+        share = (current - now) / len(active)
+        for i in active:
+            deltas[i] += share
+        now = current
+        active = remaining
+        rounds += 1
+
+    for i in range(n):
+        if abs(eps[i]) <= starts[i].epsilon:
+            statuses[i] = Status.CONVERGED
+    return [errors[i] if i in errors else Result(xs[i], iterations[i], eps[i], deltas[i], statuses[i])
+            for i in range(n)]
+
+
+def format_result(func: F, df: F, initial_x: Union[int, float], epsilon: float, max_iterations: int,
+                  result: Result, verbose: bool=False) -> str:
+    """Retorna a representação textual do resultado de uma execução do método."""
+    output = OUTPUT_VERBOSE if verbose else OUTPUT
+    if result.status in (Status.TIMEOUT, Status.STALLED, Status.DOMAIN):
+        output += OUTPUT_STATUS_VERBOSE if verbose else OUTPUT_STATUS
+    return output.format(
+        func=func,
+        df=df,
+        initial_x=initial_x,
+        max_iterations=max_iterations,
+        iteration=result.iteration,
+        x=result.x,
+        epsilon=epsilon,
+        eps=result.eps,
+        delta=result.delta,
+        status=STATUS_MESSAGES[result.status]
+    )
+
+
+def newton_raphson(func: F, epsilon: float, initial_x: Union[int, float], max_iterations: int,
+                   verbose: bool=False, deadline: Optional[datetime.datetime]=None,
+                   adaptive: bool=False) -> str:
+    if adaptive:
+        result = solve_adaptive(func, epsilon, initial_x, max_iterations, deadline)
     else:
-        return OUTPUT.format(
-            func=func,
-            df=df,
-            initial_x=initial_x,
-            max_iterations=max_iterations,
-            iteration=iteration,
-            x=x,
-            epsilon=epsilon,
-            eps=eps,
-            delta=delta
-        )
+        result = solve(func, epsilon, initial_x, max_iterations, deadline)
+    return format_result(func, func.derive(), initial_x, epsilon, max_iterations, result, verbose)
+
+
+def bind(template: str, param: str, value: Union[int, float]) -> str:
+    """Substitui cada ocorrência de `{param}` em `template` pelo valor `value`.
+
+    O parâmetro deve ocupar a posição de um coeficiente ou de uma constante; o sinal de
+    um valor negativo é combinado com o sinal que o precede. O valor é escrito em notação
+    decimal com todos os dígitos de sua representação, sem arredondamento.
+    """
+    if not math.isfinite(value):
+        raise ParseError(f"Valor inválido para '{param}': {value}")
+
+    key = f"{{{param}}}"
+    numeral = format(decimal.Decimal(repr(abs(value))), 'f')
+    if numeral == '0':
+        numeral = '.0'
+    elif numeral.startswith('0.'):
+        numeral = numeral[1:]
+
+    pieces = template.split(key)
+    bound = pieces[0]
+    for piece in pieces[1:]:
+        if value < 0:
+            if bound.endswith('-'):
+                bound = f"{bound[:-1]}+"
+            elif bound.endswith('+'):
+                bound = f"{bound[:-1]}-"
+            else:
+                bound += '-'
+        bound += numeral + piece
+    return bound
+
+
+def track(template: str, param: str, start: Tuple[float, float], slope: float, target: float,
+          epsilon: float, deadline: Optional[datetime.datetime]=None
+          ) -> Tuple[Result, Union[int, float], int]:
+    """Acompanha a raiz de `template` desde `start`, um par (parâmetro, raiz), até o
+    parâmetro `target`.
+
+    Cada passo parte da raiz anterior, corrigida pela inclinação `slope` da raiz em relação
+    ao parâmetro. Se um passo não convergir em `CONTINUATION_KMAX` iterações, ou se a função
+    de um valor intermediário do parâmetro for inválida, o passo é reduzido à metade. O acompanhamento falha, com a situação `Status.STALLED`, se o passo
+    for reduzido mais de `CONTINUATION_HALVINGS` vezes ou se o prazo `deadline` for
+    ultrapassado.
+
+    Retorna o resultado, cujas iterações e tempo somam todas as tentativas, o x inicial da
+    última tentativa e a soma dos máximos de iterações de todas as tentativas.
+    """
+    p, x = start
+    step = target - p
+    iteration = 0
+    delta = datetime.timedelta()
+    halvings = 0
+    attempts = 0
+
+    while True:
+        q = target if abs(target - p) <= abs(step) else p + step
+        seed = x + slope * (q - p)
+        attempts += 1
+        try:
+            func = Scanner(bind(template, param, q)).scan()
+            result = solve(func, epsilon, seed, CONTINUATION_KMAX, deadline)
+            iteration += result.iteration
+            delta += result.delta
+            failed = isinstance(result.x, complex) or not result.converged(epsilon)
+        except SolveError as error:
+            result = Result(error.x, error.iteration, float('nan'), datetime.timedelta(), Status.STALLED)
+            iteration += error.iteration
+            failed = True
+        except ParseError:
+            result = Result(x, 0, float('nan'), datetime.timedelta(), Status.STALLED)
+            failed = True
+
+        if failed:
+            halvings += 1
+            if halvings > CONTINUATION_HALVINGS or result.status is Status.TIMEOUT:
+                return (Result(result.x, iteration, result.eps, delta, Status.STALLED), seed,
+                        attempts * CONTINUATION_KMAX)
+            step /= 2
+            continue
+
+        if q == target:
+            return Result(result.x, iteration, result.eps, delta), seed, attempts * CONTINUATION_KMAX
+        slope = (result.x - x) / (q - p)
+        p, x = q, result.x
+
+
+def continuation(template: str, param: str, values: List[float], epsilon: float,
+                 initial_x: Union[int, float], max_iterations: int, verbose: bool=False,
+                 deadline: Optional[datetime.datetime]=None, adaptive: bool=False
+                 ) -> List[Union[str, ParseError, SolveError]]:
+    """Executa o método de Newton sobre `template` para cada valor do parâmetro `param` em `values`.
+
+    O primeiro valor parte de `initial_x`; cada valor seguinte parte da raiz encontrada para
+    o valor anterior (veja `track`). Se o acompanhamento falhar, a execução recomeça de
+    `initial_x`, com até `max_iterations` iterações (veja `solve_adaptive` se `adaptive`
+    for verdadeiro). O prazo `deadline` vale para a varredura inteira.
+
+    Retorna, para cada valor e na mesma ordem, a representação textual do resultado ou, se a
+    função for inválida ou a execução falhar, a exceção `ParseError` ou `SolveError`
+    correspondente, sem interromper a varredura. O resultado de cada valor reporta o x
+    inicial da última tentativa, e as iterações e o máximo de iterações de todas as
+    tentativas, inclusive as do acompanhamento que falhou.
+    """
+    outputs: List[Union[str, ParseError, SolveError]] = []
+    previous: Optional[Tuple[float, float]] = None
+    slope: float = 0
+
+    for value in values:
+        try:
+            func = Scanner(bind(template, param, value)).scan()
+            result: Optional[Result] = None
+            tracked: Optional[Result] = None
+            seed: Union[int, float] = initial_x
+            cap: int = 0
+            if previous is not None:
+                tracked, seed, cap = track(template, param, previous, slope, value, epsilon, deadline)
+                if tracked.status is Status.CONVERGED:
+                    result = tracked
+            if result is None:
+                seed = initial_x
+                cap += max_iterations
+                if adaptive:
+                    result = solve_adaptive(func, epsilon, initial_x, max_iterations, deadline)
+                else:
+                    result = solve(func, epsilon, initial_x, max_iterations, deadline)
+                if tracked is not None:
+                    result = result._replace(iteration=tracked.iteration + result.iteration,
+                                             delta=tracked.delta + result.delta)
+        except (ParseError, SolveError) as error:
+            previous = None
+            slope = 0
+            outputs.append(error)
+            continue
+
+        if result.converged(epsilon) and not isinstance(result.x, complex):
+            if previous is not None and value != previous[0]:
+                slope = (result.x - previous[1]) / (value - previous[0])
+            previous = (value, result.x)
+        else:
+            previous = None
+            slope = 0
+
+        outputs.append(format_result(func, func.derive(), seed, epsilon, cap, result, verbose))
+
+    return outputs
@@ -27,10 +27,15 @@
 #
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-from typing import Union, NamedTuple, List, Optional
+import math
+from typing import Union, NamedTuple, List, Optional, Dict, Tuple
 
 
 __all__ = [
+    'ParseError',
+    'DomainError',
+    'Powers',
+    'Horner',
     'K',
     'X',
     'M',
@@ -39,6 +44,96 @@ __all__ = [
 ]
 
 
+class ParseError(ValueError):
+    """Exceção ParseError.
+
+    Indica uma sequência de caractéres inválida. O atributo `reason` descreve o erro e o
+    atributo `position`, quando conhecido, é a posição do caractére em que ele ocorreu.
+    """
+
+    def __init__(self, reason: str, position: Optional[int]=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.position = position
+
+
+# Razão máxima entre o grau e o número de termos de um polinômio para que a forma de Horner
+# seja usada; polinômios mais esparsos são avaliados termo a termo.
+HORNER_SPARSITY = 4
+
+
+class DomainError(ArithmeticError):
+    """Exceção DomainError.
+
+    Indica que uma potência de expoente fracionário ou negativo não tem valor real
+    no ponto avaliado.
+    """
+
+
+class Powers:
+    """Classe auxiliar Powers.
+
+    Calcula as potências de um único valor `x`. O logaritmo e o inverso de `x` são
+    calculados no máximo uma vez, e cada potência é guardada, de modo que todos os
+    termos de uma função e de sua derivada avaliados no mesmo ponto os reaproveitam.
+    """
+
+    def __init__(self, x: Union[int, float]):
+        self.x = x
+        self._log: Optional[float] = None
+        self._inverse: Optional[float] = None
+        self._cache: Dict[Union[int, float], Union[int, float]] = {}
+
+    def log(self) -> float:
+        """Retorna o logaritmo natural de `x`."""
+        if self._log is None:
+            if self.x <= 0:
+                raise DomainError(f"Expoente fracionário indefinido para x={self.x}.")
+            self._log = math.log(self.x)
+        return self._log
+
+    def inverse(self) -> float:
+        """Retorna o inverso de `x`."""
+        if self._inverse is None:
+            if self.x == 0:
+                raise DomainError(f"Expoente negativo indefinido para x={self.x}.")
+            self._inverse = 1 / self.x
+        return self._inverse
+
+    def get(self, e: Union[int, float]) -> Union[int, float]:
+        """Retorna `x` elevado ao expoente `e`."""
+        if e in self._cache:
+            return self._cache[e]
+        if float(e).is_integer():
+            n = int(e)
+            value = self.x ** n if n >= 0 else self.inverse() ** -n
+        elif self.x == 0 and e > 0:
+            value = 0.0
+        else:
+            value = math.exp(e * self.log())
+        self._cache[e] = value
+        return value
+
+
+class Horner(NamedTuple):
+    """Classe imutável Horner.
+
+    Representa um polinômio pelos seus coeficientes `coefficients`, do termo de maior grau
+    ao termo constante.
+    """
+    coefficients: List[Union[int, float]]
+
+    def eval(self, x: Union[int, float]) -> Tuple[Union[int, float], Union[int, float]]:
+        """Calcula e retorna, em uma única passagem pelos coeficientes, o valor deste polinômio
+        e de sua derivada em `x`."""
+        f = 0
+        df = 0
+        for c in self.coefficients:
+            df = df * x + f
+            f = f * x + c
+        return f, df
+
+
 class K(NamedTuple):
     """Classe imutável K.
 
@@ -62,6 +157,9 @@ class K(NamedTuple):
     def eval(self, **kwargs) -> Union[int, float]:
         return self.k
 
+    def eval_fused(self, powers: Powers) -> Tuple[Union[int, float], Union[int, float]]:
+        return self.k, 0
+
 
 class X(NamedTuple):
     """Classe imutável X.
@@ -141,6 +239,24 @@ class M(NamedTuple):
         e = self.e.eval(**kwargs)
         return k * (x ** e)
 
+    def eval_fused(self, powers: Powers) -> Tuple[Union[int, float], Union[int, float]]:
+        """Calcula e retorna o valor deste monômio e de sua derivada no ponto de `powers`.
+
+        A potência da derivada é obtida da potência do monômio, multiplicada pelo inverso de x.
+        """
+        k = self.k.k
+        e = self.e.k
+        p = powers.get(e)
+        if e == 0:
+            return k * p, 0
+        if powers.x == 0:
+            return k * p, k * e * powers.get(e - 1)
+        return k * p, k * e * p * powers.inverse()
+
+    def is_polynomial(self) -> bool:
+        """Retorna verdadeiro se o expoente deste monômio é um inteiro não negativo."""
+        return self.e.k >= 0 and float(self.e.k).is_integer()
+
 
 class F(NamedTuple):
     """Classe imutável F.
@@ -181,6 +297,35 @@ class F(NamedTuple):
         """Calcula e retorna o valor desta função, subtituindo todas as variáveis."""
         return sum([m.eval(**kwargs) for m in self.ems])
 
+    def eval_fused(self, powers: Powers) -> Tuple[Union[int, float], Union[int, float]]:
+        """Calcula e retorna, em uma única passagem pelos termos, o valor desta função e de sua
+        derivada no ponto de `powers`."""
+        f = 0
+        df = 0
+        for m in self.ems:
+            fm, dm = m.eval_fused(powers)
+            f += fm
+            df += dm
+        return f, df
+
+    def is_polynomial(self) -> bool:
+        """Retorna verdadeiro se nenhum termo desta função tem expoente fracionário ou negativo."""
+        return all(m.is_polynomial() for m in self.ems if isinstance(m, M))
+
+    def horner(self) -> Optional[Horner]:
+        """Retorna esta função na forma de Horner, ou None se ela não for um polinômio ou se seus
+        termos forem esparsos demais (veja `HORNER_SPARSITY`)."""
+        if not self.is_polynomial():
+            return None
+        terms: Dict[int, Union[int, float]] = {}
+        for m in self.ems:
+            n = int(m.e.k) if isinstance(m, M) else 0
+            terms[n] = terms.get(n, 0) + (m.k.k if isinstance(m, M) else m.k)
+        degree = max(terms, default=0)
+        if degree > HORNER_SPARSITY * len(terms):
+            return None
+        return Horner([terms.get(n, 0) for n in range(degree, -1, -1)])
+
 
 class Scanner:
     """Classe auxiliar Scanner.
@@ -206,8 +351,7 @@ class Scanner:
         i = 0
         while self.get() is not None:
             if i >= len(self._fs):
-                print(f"unconditional loop.")
-                quit()
+                raise ParseError("Laço incondicional.", self._ind)
             if empty:
                 if self.match(*tuple('123456789.')):
                     self.scan_term()
@@ -226,8 +370,7 @@ class Scanner:
             elif self.match(' ', ';'):
                 break
             else:
-                print(f"Caractére inexperado na posição {self._ind}: '{self.get()}'")
-                quit()
+                raise ParseError(f"Caractére inexperado na posição {self._ind}: '{self.get()}'", self._ind)
             i += 1
 
         return F(self._monomials)
@@ -272,8 +415,8 @@ class Scanner:
                 if not decimal:
                     decimal = True
                 else:
-                    print(f"Caractére inesperado: segundo ponto decimal na posição {self._ind}.")
-                    quit()
+                    raise ParseError(f"Caractére inesperado: segundo ponto decimal na posição {self._ind}.",
+                                     self._ind)
             self.k += self.get()
             self.next()
 
@@ -286,8 +429,8 @@ class Scanner:
             self.expect('^')
             self.next()
         if self.match('-'):
-            print(f"Caractére inexperado ('-') na posição {self._ind}: expoente negativo deve estar cercado por parênteses.")
-            quit()
+            raise ParseError(f"Caractére inexperado ('-') na posição {self._ind}: expoente negativo deve estar "
+                             f"cercado por parênteses.", self._ind)
 
         if self.match('('):
             self.next()
@@ -301,19 +444,19 @@ class Scanner:
                 if not decimal:
                     decimal = True
                 else:
-                    print(f"Caractére inesperado: segundo ponto decimal na posição {self._ind}.")
-                    quit()
+                    raise ParseError(f"Caractére inesperado: segundo ponto decimal na posição {self._ind}.",
+                                     self._ind)
             else:
                 num = True
             self.e += self.get()
             self.next()
 
         if not num:
-            print(f"Nenhum dígito no expoente, na posição {self._ind}.")
-            quit()
+            raise ParseError(f"Nenhum dígito no expoente, na posição {self._ind}.", self._ind)
 
         if end is not None:
             self.expect(end)
+            self.next()
 
     # region
 
@@ -351,15 +494,15 @@ class Scanner:
         """Aborta a execução do scanner se o caractére atual não corresponder a um dos valores
         de `*value`.
 
-        Uma mensagem de erro indicando o caractére esperado é impressa no prompt.
+        Uma exceção `ParseError` indicando o caractére esperado é lançada.
         """
         if not self.match(*value):
             if len(value) == 1:
-                print(f"'{value[0]}' esperado, ao invés de {self.get()} na posição {self._ind}.")
+                reason = f"'{value[0]}' esperado, ao invés de {self.get()} na posição {self._ind}."
             else:
                 v = ', '.join([f"'{l}'" for l in value])
-                print(f"{v} esperado, ao invés de '{self.get()}' na posição {self._ind}.")
+                reason = f"{v} esperado, ao invés de '{self.get()}' na posição {self._ind}."
 
-            quit()
+            raise ParseError(reason, self._ind)
 
     # endregion